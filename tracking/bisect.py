@@ -0,0 +1,430 @@
+"""Find the hayagriva commit that changes a metric of the output summary.
+
+Wheels are built from a local clone of hayagriva, so everything works offline once cargo's registry cache is populated.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from dataclasses import asdict
+from functools import partial
+from hashlib import sha256
+from io import BytesIO
+from multiprocessing import get_context
+from pathlib import Path
+from sys import stderr
+from typing import Any, get_args
+
+import click
+
+from .diff import Ignorance, diff_outputs
+from .fixture import FILE, ensure_fixture
+from .history import OutputSummary
+from .load_entries import load_entries
+from .util import BISECT_CACHE_DIR
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+_CRATE_FILES = ("Cargo.toml", "Cargo.lock", "pyproject.toml", "src/lib.rs")
+"""Files of this repository required to build the python package."""
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(repo), *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _resolve_rev(repo: Path, rev: str) -> str:
+    """Resolve a git revision or a `hayagriva_source` in `history.toml` to a full commit hash."""
+    if rev.startswith("git+") and "#" in rev:
+        rev = rev.rsplit("#", maxsplit=1)[1]
+    try:
+        return _git(repo, "rev-parse", "--verify", f"{rev}^{{commit}}")
+    except subprocess.CalledProcessError as e:
+        raise click.BadParameter(f"Unknown revision in {repo}: {rev}") from e
+
+
+def _check_metric(metric: str) -> None:
+    """Make sure `metric` is readable by `_read_metric`, and its bucket name is valid."""
+    differences = {*get_args(Ignorance.__value__), "Unknown"}
+
+    match metric.split(".", maxsplit=1):
+        case ["n_diff"]:
+            valid = True
+        case ["diff_counts", key]:
+            valid = key in differences
+        case ["cause_counts", key]:
+            valid = key in {"All", "Unknown"} or all(
+                d in differences - {"Unknown"} for d in key.split("+")
+            )
+        case _:
+            valid = False
+
+    if not valid:
+        raise click.BadParameter(
+            f"Unknown metric: {metric}. Differences are: {', '.join(sorted(differences))}.",
+            param_hint="--metric",
+        )
+
+
+def _read_metric(summary: dict[str, Any], metric: str) -> int:
+    """Read a metric from an `OutputSummary` in dict form.
+
+    `metric` is either `n_diff`, `diff_counts.<difference>`, or `cause_counts.<cause>`.
+    A missing bucket counts as zero.
+    """
+    match metric.split(".", maxsplit=1):
+        case ["n_diff"]:
+            return summary["n_diff"]
+        case ["diff_counts" | "cause_counts" as field, key]:
+            return summary[field].get(key, 0)
+        case _:
+            raise click.BadParameter(f"Unknown metric: {metric}")
+
+
+def _crate_digest() -> str:
+    """Hash the files of this repository that affect the build, so that the cache is invalidated when they change."""
+    h = sha256()
+    for name in _CRATE_FILES:
+        if (file := _ROOT / name).exists():
+            h.update(name.encode())
+            h.update(file.read_bytes())
+    return h.hexdigest()[:8]
+
+
+def _display(path: Path) -> Path:
+    """Shorten `path` for messages if it is under the current directory."""
+    try:
+        return path.relative_to(Path.cwd())
+    except ValueError:
+        return path
+
+
+def _build(
+    repo: Path, commit: str, *, digest: str, maturin: str, retry_failed: bool
+) -> Path | None:
+    """Build the python package against a hayagriva commit, and return the directory to add to `sys.path`.
+
+    Results are cached in `BISECT_CACHE_DIR`, including failures unless `retry_failed`.
+    Returns `None` if the build fails.
+    """
+    work_dir = BISECT_CACHE_DIR / f"{commit}-{digest}"
+    site_dir = work_dir / "site"
+    failure_log = work_dir / "build-failed.log"
+
+    if site_dir.exists():
+        return site_dir
+    if failure_log.exists():
+        if not retry_failed:
+            print(
+                f"Using cached build failure for {commit[:7]}. (Delete {_display(failure_log)} or pass --retry-failed to retry.)",
+                file=stderr,
+            )
+            return None
+        failure_log.unlink()
+
+    print(f"Building {commit[:7]} …", file=stderr)
+
+    build_dir = work_dir / "build"
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+    # Export the hayagriva source without touching the clone's worktrees
+    hayagriva_dir = build_dir / "hayagriva"
+    archive = subprocess.run(
+        ["git", "-C", str(repo), "archive", "--format=tar", commit],
+        check=True,
+        capture_output=True,
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(hayagriva_dir, filter="data")
+
+    # Copy this crate, and point its hayagriva dependency to the exported source
+    from tomlkit import inline_table, parse
+
+    crate_dir = build_dir / "hayagriva-py"
+    for name in _CRATE_FILES:
+        if (file := _ROOT / name).exists():
+            (crate_dir / name).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file, crate_dir / name)
+
+    manifest = crate_dir / "Cargo.toml"
+    doc = parse(manifest.read_text(encoding="utf-8"))
+    dependency = doc["dependencies"]["hayagriva"]  # type: ignore
+    local_dependency = inline_table()
+    local_dependency["path"] = hayagriva_dir.resolve().as_posix()
+    for key in ("features", "default-features"):
+        if key in dependency:
+            local_dependency[key] = dependency[key]
+    doc["dependencies"]["hayagriva"] = local_dependency  # type: ignore
+    manifest.write_text(doc.as_string(), encoding="utf-8")
+
+    wheel_dir = build_dir / "dist"
+    result = subprocess.run(
+        [
+            *(maturin, "build", "--release"),
+            *("--manifest-path", str(manifest)),
+            *("--interpreter", sys.executable),
+            *("--out", str(wheel_dir)),
+        ],
+        env={
+            **os.environ,
+            # Share compiled dependencies among commits
+            "CARGO_TARGET_DIR": str(BISECT_CACHE_DIR / "cargo-target"),
+            "CARGO_NET_OFFLINE": "true",
+        },
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        failure_log.write_text(result.stdout + result.stderr, encoding="utf-8")
+        print(
+            f"Failed to build {commit[:7]}. See {_display(failure_log)} for details.",
+            file=stderr,
+        )
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return None
+
+    # Unpack the wheel, then make it visible atomically
+    wheel = next(wheel_dir.glob("*.whl"))
+    site_tmp = work_dir / "site.tmp"
+    shutil.rmtree(site_tmp, ignore_errors=True)
+    with zipfile.ZipFile(wheel) as z:
+        z.extractall(site_tmp)
+    site_tmp.rename(site_dir)
+
+    shutil.rmtree(build_dir, ignore_errors=True)
+    return site_dir
+
+
+def _measure(
+    site_dir: Path, entries: str, csl: str, expected_output: str
+) -> dict[str, Any]:
+    """Run the tracker with the hayagriva in `site_dir`.
+
+    This must run in a fresh process, because an extension module cannot be reloaded.
+    Failures are raised as `RuntimeError`.
+    """
+    sys.path.insert(0, str(site_dir))
+    import hayagriva
+
+    assert Path(hayagriva.__file__).resolve().is_relative_to(site_dir.resolve()), (
+        f"Imported a wrong hayagriva: {hayagriva.__file__}"
+    )
+
+    try:
+        actual_output = hayagriva.reference(entries, csl)
+    except BaseException as e:  # noqa: BLE001
+        # Exceptions from the extension module, e.g. pyo3's `PanicException`, cannot be unpickled in the parent process, which would break the whole pool.
+        raise RuntimeError(repr(e)) from None
+    output_summary = OutputSummary.from_diff_list(
+        diff_list=diff_outputs(expected_output, actual_output),
+        n_entries=len(expected_output.splitlines()),
+    )
+    return asdict(output_summary)
+
+
+def _pick_probes(candidates: list[int], k: int) -> list[int]:
+    """Pick `k` evenly spaced candidates, splitting them into `k + 1` parts."""
+    if len(candidates) <= k:
+        return candidates
+    return sorted({candidates[i * len(candidates) // (k + 1)] for i in range(1, k + 1)})
+
+
+assert _pick_probes([1, 2], 3) == [1, 2]
+assert _pick_probes(list(range(1, 8)), 1) == [4]
+assert _pick_probes(list(range(1, 12)), 3) == [3, 6, 9]
+
+
+for _metric in (
+    "n_diff",
+    "diff_counts.卷",
+    "cause_counts.All",
+    "cause_counts.case+punct",
+):
+    _check_metric(_metric)
+for _metric in (
+    "diff",
+    "diff_counts.All",
+    "cause_counts.puntc",
+    "cause_counts.Unknown+case",
+):
+    try:
+        _check_metric(_metric)
+    except click.BadParameter:
+        pass
+    else:
+        raise AssertionError(f"{_metric} should be rejected.")
+
+
+@click.command()
+@click.argument(
+    "repo",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.argument("good")
+@click.argument("bad")
+@click.option(
+    "--metric",
+    default="n_diff",
+    show_default=True,
+    help="The metric to watch: n_diff, diff_counts.<difference>, or cause_counts.<cause>.",
+)
+@click.option(
+    "-k",
+    "--probes",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Number of commits to test in parallel per round.",
+)
+@click.option(
+    "--retry-failed",
+    is_flag=True,
+    default=False,
+    help="Rebuild commits whose build failures are cached, e.g. after `cargo fetch`.",
+)
+def main(
+    repo: Path, good: str, bad: str, metric: str, probes: int, retry_failed: bool
+) -> None:
+    """Find the first hayagriva commit between GOOD and BAD that changes the metric.
+
+    REPO is a local clone of hayagriva. GOOD and BAD are git revisions in it, or `hayagriva_source` values in `history.toml`.
+    """
+    # Fail early on a malformed metric
+    _check_metric(metric)
+
+    if (maturin := shutil.which("maturin")) is None:
+        raise click.ClickException("maturin is required to build hayagriva.")
+
+    good_commit = _resolve_rev(repo, good)
+    bad_commit = _resolve_rev(repo, bad)
+    try:
+        _git(repo, "merge-base", "--is-ancestor", good_commit, bad_commit)
+    except subprocess.CalledProcessError as e:
+        raise click.BadParameter(f"{good} is not an ancestor of {bad}.") from e
+
+    commits = [
+        good_commit,
+        *_git(
+            repo,
+            *("rev-list", "--first-parent", "--ancestry-path", "--reverse"),
+            f"{good_commit}..{bad_commit}",
+        ).splitlines(),
+    ]
+    print(f"{len(commits) - 1} commits to bisect.", file=stderr)
+
+    ensure_fixture()
+    expected_output = FILE.expected_output.read_text(encoding="utf-8")
+    csl = FILE.csl.read_text(encoding="utf-8")
+    entries = load_entries(FILE.entries)
+
+    BISECT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    digest = _crate_digest()
+
+    values: dict[int, int | None] = {}
+    """Metric values of tested commits, indexed by their positions in `commits`. `None` means the commit is skipped."""
+    skip_reasons: dict[int, str] = {}
+
+    def test(indices: list[int]) -> None:
+        # Cargo serializes builds sharing a target directory, so build one by one.
+        sites = {
+            i: _build(
+                repo,
+                commits[i],
+                digest=digest,
+                maturin=maturin,
+                retry_failed=retry_failed,
+            )
+            for i in indices
+        }
+        for i, site in sites.items():
+            if site is None:
+                values[i] = None
+                skip_reasons[i] = "build failed"
+
+        # Run each commit in its own process pool, because different builds of hayagriva cannot be loaded into the same process,
+        # and a crashing build (e.g. `panic=abort`) must not break the runs of other commits.
+        if runnable := [i for i, site in sites.items() if site is not None]:
+            with ExitStack() as stack:
+                measure = partial(
+                    _measure, entries=entries, csl=csl, expected_output=expected_output
+                )
+                futures = {
+                    i: stack.enter_context(
+                        ProcessPoolExecutor(
+                            max_workers=1, mp_context=get_context("spawn")
+                        )
+                    ).submit(measure, sites[i])
+                    for i in runnable
+                }
+                for i, future in futures.items():
+                    try:
+                        values[i] = _read_metric(future.result(), metric)
+                    except KeyboardInterrupt:
+                        raise
+                    except BrokenProcessPool:
+                        # The process of this commit died, e.g. on a stack overflow or `panic=abort`
+                        values[i] = None
+                        skip_reasons[i] = "run crashed"
+                    except BaseException as e:  # noqa: BLE001
+                        # Including pyo3's `PanicException`, which derives from `BaseException`
+                        values[i] = None
+                        skip_reasons[i] = f"run failed: {e!r}"
+
+        for i in indices:
+            if i in skip_reasons:
+                print(f"  {commits[i][:7]}: skipped ({skip_reasons[i]})", file=stderr)
+            else:
+                print(f"  {commits[i][:7]}: {metric} = {values[i]}", file=stderr)
+
+    lo, hi = 0, len(commits) - 1
+    test([lo, hi])
+    if values[lo] is None or values[hi] is None:
+        raise click.ClickException(
+            "Failed to test GOOD or BAD: "
+            + "; ".join(skip_reasons[i] for i in (lo, hi) if i in skip_reasons)
+        )
+    if values[lo] == values[hi]:
+        raise click.ClickException(f"{metric} is the same for GOOD and BAD.")
+
+    # Invariant: `values[lo]` equals the good value, and `values[hi]` does not.
+    while candidates := [i for i in range(lo + 1, hi) if i not in values]:
+        print(
+            f"Testing {min(probes, len(candidates))} of {len(candidates)} commits …",
+            file=stderr,
+        )
+        test(_pick_probes(candidates, probes))
+
+        for i in range(lo + 1, hi):
+            if (v := values.get(i)) is None:
+                continue
+            if v == values[lo]:
+                lo = i
+            else:
+                hi = i
+                break
+
+    print(f"First commit changing {metric} ({values[lo]} → {values[hi]}):")
+    print(_git(repo, "show", "--no-patch", "--format=%H%n%an, %ad%n%s", commits[hi]))
+
+    if skipped := list(range(lo + 1, hi)):
+        print(
+            "\nThe following commits were skipped, so any of them might be the first one instead:"
+        )
+        for i in skipped:
+            print(f"  {commits[i]} ({skip_reasons[i]})")
+
+
+if __name__ == "__main__":
+    main()
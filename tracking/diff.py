@@ -1,4 +1,5 @@
 import re
+from collections import deque
 from dataclasses import dataclass
 from typing import Literal
 
@@ -104,6 +105,20 @@ class Difference:
         )
 
 
+def diff_outputs(expected_output: str, actual_output: str, /) -> list[Difference]:
+    """Compare the expected and actual outputs line by line, and return the sorted differences."""
+    diff_deque: deque[Difference] = deque()
+    for expected, actual in zip(
+        expected_output.splitlines(), actual_output.splitlines()
+    ):
+        if expected != actual:
+            diff_deque.append(Difference(expected, actual))
+
+    diff_list = list(diff_deque)
+    diff_list.sort(key=Difference.as_key)
+    return diff_list
+
+
 def _map_zh_to_bilingual(x: str, /) -> str:
     """Convert a bibliography entry from (Simplified) Chinese to English if appropriate.
 
@@ -1,4 +1,3 @@
-from collections import deque
 from dataclasses import asdict
 from pathlib import Path
 from sys import stderr
@@ -6,7 +5,7 @@ from sys import stderr
 import click
 from hayagriva import check_csl, reference
 
-from .diff import Difference
+from .diff import diff_outputs
 from .fixture import FILE, ensure_fixture
 from .history import InputVersion, OutputSummary
 from .load_entries import load_entries
@@ -23,15 +22,7 @@ def compare_outputs(
 ) -> None:
     """Compare the expected and actual outputs, and print the differences."""
 
-    diff_deque: deque[Difference] = deque()
-    for expected, actual in zip(
-        expected_output.splitlines(), actual_output.splitlines()
-    ):
-        if expected != actual:
-            diff_deque.append(Difference(expected, actual))
-
-    diff_list = list(diff_deque)
-    diff_list.sort(key=Difference.as_key)
+    diff_list = diff_outputs(expected_output, actual_output)
 
     if show_details:
         for n, diff in enumerate(diff_list, start=1):
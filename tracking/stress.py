@@ -0,0 +1,261 @@
+"""Measure how the cost of `reference` grows with synthetic inputs."""
+
+import json
+import math
+import sys
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from sys import stderr
+from time import perf_counter
+from typing import Literal
+
+import click
+
+from .fixture import FILE, ensure_fixture
+from .load_entries import load_entries
+from .synthetic import synthesize
+from .util import CACHE_DIR
+
+
+def _proc_status(field: str) -> int | None:
+    """Read a memory field of `/proc/self/status` in bytes on Linux."""
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{field}:"):
+            value, unit = line.split()[1:]
+            assert unit == "kB"
+            return int(value) * 1024
+    return None
+
+
+def _peak_rss() -> int | None:
+    """Peak resident set size of the current process in bytes, or `None` if unsupported."""
+    if sys.platform == "linux":
+        # `ru_maxrss` is inherited from the parent process across spawn, but `VmHWM` is not.
+        return _proc_status("VmHWM")
+    elif sys.platform == "darwin":
+        import resource
+
+        # macOS reports in bytes.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        return None
+
+
+def _reset_peak_rss() -> int | None:
+    """Reset the peak RSS if possible, and return the baseline to measure later growth against.
+
+    On Linux, the baseline is the current RSS. On macOS, the peak cannot be reset, so the baseline is the peak so far.
+    """
+    if sys.platform == "linux":
+        try:
+            Path("/proc/self/clear_refs").write_text("5")
+        except OSError:
+            pass  # Then `VmHWM` might include previous peaks.
+        return _proc_status("VmRSS")
+    else:
+        return _peak_rss()
+
+
+def _best_duration(f: Callable[[], object], repeat: int) -> float:
+    """Run `f` for `repeat` times, and return the shortest duration in seconds."""
+    durations: list[float] = []
+    for _ in range(repeat):
+        start = perf_counter()
+        f()
+        durations.append(perf_counter() - start)
+    return min(durations)
+
+
+def _measure(
+    corpus_file: Path, csl: str, repeat: int
+) -> tuple[float, float, int | None, int | None]:
+    """Format the corpus, and return the durations and RSS.
+
+    Returns the best total duration and the best fixed duration in seconds, the baseline RSS, and the peak RSS.
+    The fixed duration is that of formatting no entries, which includes parsing the style and loading locales.
+    The baseline RSS is taken right before formatting, so the growth is due to `reference` only.
+
+    This must run in a fresh process, because peak RSS never decreases.
+    """
+    from hayagriva import reference
+
+    entries = load_entries(corpus_file)
+
+    # Warm up, and measure the cost that does not depend on entries
+    reference("[]", csl)
+    fixed = _best_duration(lambda: reference("[]", csl), repeat)
+
+    baseline_rss = _reset_peak_rss()
+    total = _best_duration(lambda: reference(entries, csl), repeat)
+    return total, fixed, baseline_rss, _peak_rss()
+
+
+def _fit_power(xs: list[int], ys: list[float]) -> tuple[float, float] | None:
+    """Fit y ≈ a·xᵇ by least squares in log-log space, and return (a, b).
+
+    Returns `None` if there are too few positive points to fit.
+    """
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len({x for x, _ in points}) < 2:
+        return None
+
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    b = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum(
+        (x - mean_x) ** 2 for x, _ in points
+    )
+    return math.exp(mean_y - b * mean_x), b
+
+
+assert (fit := _fit_power([1, 2, 4], [3, 12, 48])) is not None
+assert math.isclose(fit[0], 3) and math.isclose(fit[1], 2)
+assert _fit_power([2, 2], [1, 1]) is None
+
+
+def _report_fit(name: str, axis: str, xs: list[int], ys: list[float]) -> None:
+    if (fit := _fit_power(xs, ys)) is None:
+        print(f"{name}: not enough data to fit.")
+        return
+
+    a, b = fit
+    print(f"{name} ≈ {a:.3g} · {axis}^{b:.2f}")
+    if b >= 1.5:
+        print(f"  Warning: superlinear in {axis}.")
+
+
+@click.command()
+@click.option(
+    "--axis",
+    type=click.Choice(["entries", "authors"]),
+    default="entries",
+    show_default=True,
+    help="The parameter to scale: number of entries, or number of authors per entry.",
+)
+@click.option(
+    "--points",
+    default="128,256,512,1024,2048",
+    show_default=True,
+    help="Comma-separated values of the scaled parameter.",
+)
+@click.option(
+    "--entries",
+    "n_entries",
+    type=click.IntRange(min=1),
+    default=128,
+    show_default=True,
+    help="Number of entries when scaling authors.",
+)
+@click.option(
+    "--authors",
+    "n_authors",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Number of authors per entry when scaling entries. (default: keep the original)",
+)
+@click.option(
+    "--collision-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    show_default=True,
+    help="Probability that an entry shares the same authors and year with others.",
+)
+@click.option(
+    "--csl",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="The CSL style. Author-date styles put more pressure on disambiguation. (default: the fixture)",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Number of runs per point. The fastest one is taken.",
+)
+@click.option("--seed", default=0, show_default=True, help="Random seed.")
+def main(
+    axis: Literal["entries", "authors"],
+    points: str,
+    n_entries: int,
+    n_authors: int | None,
+    collision_rate: float,
+    csl: Path | None,
+    repeat: int,
+    seed: int,
+) -> None:
+    """Fit how the time and memory of formatting a synthetic corpus grow along an axis.
+
+    The corpus is mutated from the fixture entries. See `tracking.synthetic` for details.
+    """
+    try:
+        values = sorted({int(p) for p in points.split(",")})
+    except ValueError as e:
+        raise click.BadParameter(
+            f"Not a list of integers: {points}", param_hint="--points"
+        ) from e
+    if values[0] < (minimum := 1 if axis == "entries" else 0):
+        raise click.BadParameter(
+            f"Values must be at least {minimum} for the {axis} axis: {points}",
+            param_hint="--points",
+        )
+
+    ensure_fixture()
+    base = json.loads(FILE.entries.read_text(encoding="utf-8"))
+    style = (csl or FILE.csl).read_text(encoding="utf-8")
+
+    corpus_dir = CACHE_DIR / "synthetic"
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    durations: list[float] = []
+    """Durations excluding the fixed cost."""
+    fixed_durations: list[float] = []
+    rss_growths: list[float] = []
+    # Each point runs in a fresh process, because peak RSS never decreases.
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=get_context("spawn"), max_tasks_per_child=1
+    ) as executor:
+        print(f"{axis:>8}  {'time':>9}  {'fixed':>9}  {'peak RSS':>10}  {'growth':>10}")
+        for value in values:
+            corpus = synthesize(
+                base,
+                value if axis == "entries" else n_entries,
+                n_authors=value if axis == "authors" else n_authors,
+                collision_rate=collision_rate,
+                seed=seed,
+            )
+            corpus_file = corpus_dir / f"{axis}-{value}.json"
+            corpus_file.write_text(
+                json.dumps(corpus, ensure_ascii=False), encoding="utf-8"
+            )
+
+            print(f"Measuring {axis} = {value} …", file=stderr)
+            total, fixed, baseline_rss, peak_rss = executor.submit(
+                _measure, corpus_file, style, repeat
+            ).result()
+
+            # The fixed cost would pull the fitted exponent towards zero.
+            durations.append(total - fixed)
+            fixed_durations.append(fixed)
+            row = f"{value:>8}  {durations[-1]:>8.3f}s  {fixed:>8.3f}s"
+            if baseline_rss is not None and peak_rss is not None:
+                rss_growths.append(peak_rss - baseline_rss)
+                print(
+                    f"{row}  {peak_rss / 2**20:>6.1f} MiB  {rss_growths[-1] / 2**20:>6.1f} MiB"
+                )
+            else:
+                print(f"{row}  {'n/a':>10}  {'n/a':>10}")
+
+    print()
+    print(
+        f"Fixed cost ≈ {min(fixed_durations):.3f}s per call, excluded from the time above."
+    )
+    _report_fit("Time", axis, values, durations)
+    if len(rss_growths) == len(values):
+        _report_fit("RSS growth", axis, values, rss_growths)
+
+
+if __name__ == "__main__":
+    main()
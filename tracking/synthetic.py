@@ -0,0 +1,130 @@
+from copy import deepcopy
+from random import Random
+from typing import Any
+
+_COLLIDING_AUTHORS: list[dict[str, str]] = [
+    {"family": "张", "given": "三"},
+    {"family": "Smith", "given": "John"},
+]
+"""Authors shared by colliding entries."""
+
+_COLLIDING_YEAR = 2000
+"""The year shared by colliding entries."""
+
+_NAME_VARIABLES = (
+    "author",
+    "editor",
+    "translator",
+    "container-author",
+    "collection-editor",
+    "original-author",
+    "reviewed-author",
+)
+"""CSL-JSON name variables made unique in non-colliding entries."""
+
+
+def _rename(name: dict[str, Any], suffix: str) -> dict[str, Any]:
+    """Make a CSL-JSON name unique by appending `suffix`."""
+    name = dict(name)
+    if "family" in name:
+        name["family"] += suffix
+    elif "literal" in name:
+        name["literal"] += suffix
+    return name
+
+
+def _resize(authors: list[dict[str, Any]], n: int, suffix: str) -> list[dict[str, Any]]:
+    """Truncate or extend the author list to `n` names, padding with names ending with `suffix`."""
+    assert n >= 0
+    if len(authors) >= n:
+        return authors[:n]
+    return authors + [
+        {"family": f"Author{j}{suffix}", "given": "A"} for j in range(len(authors), n)
+    ]
+
+
+def synthesize(
+    base: list[dict[str, Any]],
+    n_entries: int,
+    *,
+    n_authors: int | None = None,
+    collision_rate: float = 0.0,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Mutate raw CSL-JSON entries into a synthetic corpus.
+
+    Entries of `base` are repeated in order until there are `n_entries`.
+    Each entry either collides with probability `collision_rate`, i.e. it shares the same authors and year with other colliding entries to put pressure on name and year disambiguation,
+    or gets its names (or its title if it has no names) made unique otherwise.
+    If `n_authors` is given, every author list is truncated or extended to that length.
+
+    Entries whose `issued` has only a `literal` are skipped, because `load_entries` normalizes them by their ids.
+    """
+    pool = [
+        e
+        for e in base
+        if (issued := e.get("issued")) is None or set(issued.keys()) != {"literal"}
+    ]
+    assert pool, "No entry can be used as a template."
+
+    rng = Random(seed)
+    corpus: list[dict[str, Any]] = []
+    for i in range(n_entries):
+        entry = deepcopy(pool[i % len(pool)])
+        entry["id"] = f"synthetic-{i:06}"
+
+        if collides := rng.random() < collision_rate:
+            entry["author"] = deepcopy(_COLLIDING_AUTHORS)
+            entry["issued"] = {"date-parts": [[_COLLIDING_YEAR]]}
+        else:
+            suffix = f"-{i:06}"
+            names = [v for v in _NAME_VARIABLES if v in entry]
+            for v in names:
+                entry[v] = [_rename(a, suffix) for a in entry[v]]
+            if not names and "title" in entry:
+                # Styles substitute the title for missing names
+                entry["title"] += suffix
+
+        if n_authors is not None:
+            # Colliding entries are padded with the same names, so that they keep colliding.
+            entry["author"] = _resize(
+                entry.get("author", []), n_authors, "" if collides else f"-{i:06}"
+            )
+
+        corpus.append(entry)
+    return corpus
+
+
+_base = [
+    {
+        "id": "a",
+        "author": [{"family": "Doe", "given": "J"}],
+        "editor": [{"family": "Roe", "given": "R"}],
+        "issued": {"date-parts": [[1999]]},
+    },
+    {"id": "b", "author": [{"literal": "ISO"}]},
+    {"id": "c", "issued": {"literal": "2162公元前"}},
+    {"id": "d", "title": "Anonymous"},
+]
+
+_corpus = synthesize(_base, 6)
+assert [e["id"] for e in _corpus] == [f"synthetic-{i:06}" for i in range(6)]
+assert _corpus[3]["author"] == [{"family": "Doe-000003", "given": "J"}]
+assert _corpus[3]["editor"] == [{"family": "Roe-000003", "given": "R"}]
+assert _corpus[4]["author"] == [{"literal": "ISO-000004"}]
+assert _corpus[2]["title"] == "Anonymous-000002"
+assert _base[0]["author"] == [{"family": "Doe", "given": "J"}], (
+    "Base entries must not be modified."
+)
+
+_corpus = synthesize(_base, 4, collision_rate=1)
+assert all(e["author"] == _COLLIDING_AUTHORS for e in _corpus)
+assert all(e["issued"] == {"date-parts": [[_COLLIDING_YEAR]]} for e in _corpus)
+_corpus = synthesize(_base, 3, n_authors=4, collision_rate=1)
+assert all(e["author"] == _corpus[0]["author"] for e in _corpus)
+assert len(_corpus[0]["author"]) == 4
+
+_corpus = synthesize(_base, 2, n_authors=3)
+assert all(len(e["author"]) == 3 for e in _corpus)
+assert _corpus[0]["author"] != _corpus[1]["author"]
+assert synthesize(_base, 1, n_authors=0)[0]["author"] == []
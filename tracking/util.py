@@ -2,3 +2,4 @@ from pathlib import Path
 
 _ROOT = Path(__file__).resolve().parent.parent
 CACHE_DIR = _ROOT / "target" / "tracking-cache"
+BISECT_CACHE_DIR = _ROOT / "target" / "bisect-cache"